@@ -2,33 +2,78 @@
 AWS Lambda Function: Send Order Confirmation Email (Python)
 
 This Lambda function receives order events from the Order Service
-and sends confirmation emails via Amazon SES.
+and sends confirmation emails via Amazon SES. It can also be triggered
+by an SQS queue, in which case each record body is one order event.
 
 Environment Variables:
 - SENDER_EMAIL: Email address to send from (must be verified in SES)
 - REPLY_TO_EMAIL: Optional reply-to email address
+- SES_TEMPLATE_NAME: Optional SES template to render the email server-side
+  (register it once with build_ses_template(), see DEPLOY.md)
 - AWS_REGION: AWS region (default: us-east-1)
 
 """
 
+import functools
+import html
 import json
 import os
 import logging
+import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from decimal import Decimal
-import boto3
+from typing import Final
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from botocore.session import Session
+
+try:
+    # Faster JSON encoder; not in the Lambda runtime, so it must come from a layer
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize SES client (reused across invocations for performance)
-ses_client = boto3.client('ses', region_name=os.environ.get('AWS_REGION', 'ap-south-1'))
+# Concurrent SES requests while sending an SQS batch
+SES_MAX_CONCURRENCY: Final[int] = 10
+
+# Initialize SES client (reused across invocations for performance).
+# A bare botocore session is used instead of boto3 to keep cold-start imports small,
+# and pooled keep-alive connections let warm invocations skip the TCP/TLS handshake.
+ses_client = Session().create_client(
+    'ses',
+    region_name=os.environ.get('AWS_REGION', 'ap-south-1'),
+    config=Config(
+        tcp_keepalive=True,
+        max_pool_connections=SES_MAX_CONCURRENCY,
+        retries={'max_attempts': 2}
+    )
+)
 
 # Configuration from environment variables
-SENDER_EMAIL = os.environ.get('SENDER_EMAIL')
-REPLY_TO_EMAIL = os.environ.get('REPLY_TO_EMAIL', '')
+SENDER_EMAIL: Final[str] = os.environ.get('SENDER_EMAIL', '')
+REPLY_TO_EMAIL: Final[str] = os.environ.get('REPLY_TO_EMAIL', '')
+SES_TEMPLATE_NAME: Final[str] = os.environ.get('SES_TEMPLATE_NAME', '')
+
+# Fail during cold start rather than on every invocation if misconfigured
+if not SENDER_EMAIL:
+    raise RuntimeError('SENDER_EMAIL environment variable is required')
+
+# SendBulkTemplatedEmail accepts at most 50 destinations per call
+SES_BULK_BATCH_SIZE: Final[int] = 50
+
+# Fields every order email event must carry
+_REQUIRED_FIELDS: Final[tuple[str, ...]] = ('orderId', 'customerEmail', 'customerName', 'productName')
+
+# Display format for order dates, e.g. "January 31, 2024 at 10:30 AM"
+_DATE_FORMAT: Final[str] = '%B %d, %Y at %I:%M %p'
+
+# Worker threads for SQS batches (botocore clients are thread-safe);
+# threads are only started on first use and then kept for warm invocations
+batch_executor = ThreadPoolExecutor(max_workers=SES_MAX_CONCURRENCY)
 
 
 def lambda_handler(event, context):
@@ -39,17 +84,20 @@ def lambda_handler(event, context):
     It receives the order event, formats the email, and sends it via SES.
     
     Args:
-        event (dict): Order email event from Java service
+        event (dict): Order email event from Java service, or an SQS batch
         context (object): Lambda context with runtime information
         
     Returns:
-        dict: Response with statusCode and message
+        dict: Response with statusCode and message, or the SQS
+              partial batch response for SQS batches
     """
     
-    logger.info('Lambda function invoked')
-    # logger.info(f'Request ID: {context.request_id}')
-    logger.info(f'Function Name: {context.function_name}')
-    logger.info(f'Event received: {json.dumps(event, default=str)}')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Event received: %s', to_json(event, default=str))
+    
+    # SQS trigger: one order event per record
+    if 'Records' in event:
+        return process_sqs_batch(event['Records'])
     
     try:
         # Validate required fields
@@ -57,19 +105,16 @@ def lambda_handler(event, context):
         
         # Extract order data
         order_id = event.get('orderId')
-        customer_name = event.get('customerName')
-        
-        logger.info(f'Processing order: {order_id} for customer: {customer_name}')
         
         # Send email via SES
         message_id = send_order_confirmation_email(event)
         
-        logger.info(f'Email sent successfully. Message ID: {message_id}')
+        logger.info(f'Email sent successfully for order: {order_id}. Message ID: {message_id}')
         
         # Return success response
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': to_json({
                 'message': 'Email sent successfully',
                 'messageId': message_id,
                 'orderId': order_id
@@ -81,7 +126,7 @@ def lambda_handler(event, context):
         logger.error(f'Validation error: {str(e)}')
         return {
             'statusCode': 400,
-            'body': json.dumps({
+            'body': to_json({
                 'error': 'Validation error',
                 'message': str(e),
                 'orderId': event.get('orderId', 'unknown')
@@ -93,7 +138,7 @@ def lambda_handler(event, context):
         logger.error(f'SES error: {e.response["Error"]["Message"]}')
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': to_json({
                 'error': 'SES error',
                 'message': e.response['Error']['Message'],
                 'orderId': event.get('orderId', 'unknown')
@@ -105,7 +150,7 @@ def lambda_handler(event, context):
         logger.error(f'Unexpected error: {str(e)}', exc_info=True)
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': to_json({
                 'error': 'Internal server error',
                 'message': str(e),
                 'orderId': event.get('orderId', 'unknown')
@@ -113,6 +158,124 @@ def lambda_handler(event, context):
         }
 
 
+def process_sqs_batch(records):
+    """
+    Process SQS Batch
+    
+    Sends one email per record, with up to SES_MAX_CONCURRENCY requests to
+    SES in flight. With an SES template configured, the emails go out
+    through SendBulkTemplatedEmail, up to 50 per call.
+    
+    Records that are not valid order events are logged and dropped, since
+    retrying them would fail the same way; only failed sends are retried.
+    
+    Args:
+        records (list): SQS records whose bodies are order email events
+        
+    Returns:
+        dict: Partial batch response listing the records to retry
+    """
+    
+    failed_ids = []
+    orders = []
+    
+    for record in records:
+        try:
+            event = json.loads(record['body'])
+            validate_event(event)
+            orders.append((record['messageId'], event))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.error(f'Dropping invalid record {record.get("messageId")}: {str(e)}')
+    
+    if SES_TEMPLATE_NAME:
+        chunks = [orders[start:start + SES_BULK_BATCH_SIZE]
+                  for start in range(0, len(orders), SES_BULK_BATCH_SIZE)]
+        for chunk_failed_ids in batch_executor.map(send_bulk_order_emails, chunks):
+            failed_ids.extend(chunk_failed_ids)
+    else:
+        for message_id in batch_executor.map(send_sqs_order_email, orders):
+            if message_id is not None:
+                failed_ids.append(message_id)
+    
+    logger.info(f'Processed {len(records)} records, {len(failed_ids)} failed')
+    
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]
+    }
+
+
+def send_sqs_order_email(order):
+    """
+    Send the Email for One SQS Record
+    
+    Args:
+        order (tuple): (SQS message ID, order email event)
+        
+    Returns:
+        str: The SQS message ID if sending failed, otherwise None
+    """
+    message_id, event = order
+    
+    try:
+        send_order_confirmation_email(event)
+    except Exception as e:
+        logger.error(f'Failed to send email for order {event.get("orderId")}: {str(e)}')
+        return message_id
+    
+    return None
+
+
+def send_bulk_order_emails(orders):
+    """
+    Send Order Confirmation Emails via SendBulkTemplatedEmail
+    
+    Args:
+        orders (list): Up to 50 (SQS message ID, order email event) pairs
+        
+    Returns:
+        list: SQS message IDs whose emails were not sent
+    """
+    
+    try:
+        email_params = {
+            'Source': SENDER_EMAIL,
+            'Template': SES_TEMPLATE_NAME,
+            'DefaultTemplateData': '{}',
+            'Destinations': [
+                {
+                    'Destination': {
+                        'ToAddresses': [event.get('customerEmail')]
+                    },
+                    'ReplacementTemplateData': to_json(build_template_data(event))
+                }
+                for _, event in orders
+            ]
+        }
+        
+        # Add reply-to if configured
+        if REPLY_TO_EMAIL:
+            email_params['ReplyToAddresses'] = [REPLY_TO_EMAIL]
+        
+        response = ses_client.send_bulk_templated_email(**email_params)
+    except ClientError as e:
+        logger.error(f'SES error: {e.response["Error"]["Message"]}')
+        return [message_id for message_id, _ in orders]
+    except Exception as e:
+        # Other chunks may already have been sent, so only this chunk is retried
+        logger.error(f'Failed to send bulk emails: {str(e)}', exc_info=True)
+        return [message_id for message_id, _ in orders]
+    
+    # Statuses are returned in the same order as the destinations
+    failed_ids = []
+    for (message_id, event), status in zip(orders, response['Status']):
+        if status['Status'] != 'Success':
+            logger.error(f'Failed to send email for order {event.get("orderId")}: '
+                         f'{status.get("Error", status["Status"])}')
+            failed_ids.append(message_id)
+    
+    return failed_ids
+
+
 def validate_event(event):
     """
     Validate Order Email Event
@@ -125,15 +288,9 @@ def validate_event(event):
     Raises:
         ValueError: If validation fails
     """
-    required_fields = ['orderId', 'customerEmail', 'customerName', 'productName']
-    
-    for field in required_fields:
+    for field in _REQUIRED_FIELDS:
         if not event.get(field):
             raise ValueError(f'{field} is required')
-    
-    # Validate SENDER_EMAIL is configured
-    if not SENDER_EMAIL:
-        raise ValueError('SENDER_EMAIL environment variable is required')
 
 
 def send_order_confirmation_email(event):
@@ -152,22 +309,28 @@ def send_order_confirmation_email(event):
         ClientError: If SES sending fails
     """
     
-    logger.info('Generating email content...')
+    # Let SES render the email when a stored template is configured
+    if SES_TEMPLATE_NAME:
+        return send_templated_order_email(event)
     
-    # Generate email content
-    html_body = generate_html_email(event)
-    text_body = generate_text_email(event)
+    # Extract and format order data once for both versions
+    data = build_template_data(event)
+    fields = (data['orderId'], data['customerName'], data['customerEmail'],
+              data['productName'], data['productDescription'], data['quantity'],
+              data['unitPrice'], data['totalPrice'], data['orderStatus'], data['orderDate'])
     
-    logger.info('Email content generated successfully')
+    # Generate email content
+    html_body = generate_html_email(*fields)
+    text_body = generate_text_email(*fields)
     
     # Create email subject
-    subject = f"Order Confirmation - Order #{event.get('orderId')}"
+    subject = _SUBJECT_FORMAT % (data['orderId'],)
     
     # Build email parameters
     email_params = {
         'Source': SENDER_EMAIL,
         'Destination': {
-            'ToAddresses': [event.get('customerEmail')]
+            'ToAddresses': [data['customerEmail']]
         },
         'Message': {
             'Subject': {
@@ -191,41 +354,254 @@ def send_order_confirmation_email(event):
     if REPLY_TO_EMAIL:
         email_params['ReplyToAddresses'] = [REPLY_TO_EMAIL]
     
-    logger.info(f'Sending email to: {event.get("customerEmail")}')
-    
     # Send email
     response = ses_client.send_email(**email_params)
     
     return response['MessageId']
 
 
-def generate_html_email(event):
+def send_templated_order_email(event):
     """
-    Generate HTML Email Template
+    Send Order Confirmation Email via a stored SES Template
     
-    Creates a beautiful HTML email with order details.
+    Only the per-order fields are sent; SES substitutes them into the
+    template named by SES_TEMPLATE_NAME.
     
     Args:
         event (dict): Order email event
         
     Returns:
-        str: HTML email content
+        str: SES message ID
+        
+    Raises:
+        ClientError: If SES sending fails
+    """
+    
+    email_params = {
+        'Source': SENDER_EMAIL,
+        'Destination': {
+            'ToAddresses': [event.get('customerEmail')]
+        },
+        'Template': SES_TEMPLATE_NAME,
+        'TemplateData': to_json(build_template_data(event))
+    }
+    
+    # Add reply-to if configured
+    if REPLY_TO_EMAIL:
+        email_params['ReplyToAddresses'] = [REPLY_TO_EMAIL]
+    
+    response = ses_client.send_templated_email(**email_params)
+    
+    return response['MessageId']
+
+
+def build_template_data(event):
     """
+    Build Email Template Data
     
-    # Extract data with defaults
-    order_id = event.get('orderId', 'N/A')
-    customer_name = escape_html(event.get('customerName', 'Customer'))
-    customer_email = escape_html(event.get('customerEmail', ''))
-    product_name = escape_html(event.get('productName', 'Product'))
-    product_description = escape_html(event.get('productDescription', ''))
-    quantity = event.get('quantity', 1)
+    Extracts the display values for the email, applying defaults and
+    formatting dates and prices. Used both for local rendering and as
+    SES template data, since SES templates cannot format values.
+    
+    Args:
+        event (dict): Order email event
+        
+    Returns:
+        dict: Display values keyed by the SES template placeholder names
+    """
     unit_price = event.get('unitPrice')
-    total_price = event.get('totalPrice', 0)
-    order_status = event.get('orderStatus', 'CONFIRMED')
-    order_date = format_date(event.get('orderDate'))
     
-    # Build HTML
-    html = f'''
+    return {
+        'orderId': event.get('orderId', 'N/A'),
+        'customerName': event.get('customerName', 'Customer'),
+        'customerEmail': event.get('customerEmail', ''),
+        'productName': event.get('productName', 'Product'),
+        'productDescription': event.get('productDescription', ''),
+        'quantity': event.get('quantity', 1),
+        'unitPrice': format_price(unit_price) if unit_price else '',
+        'totalPrice': format_price(event.get('totalPrice', 0)),
+        'orderStatus': event.get('orderStatus', 'CONFIRMED'),
+        'orderDate': format_date(event.get('orderDate'))
+    }
+
+
+def build_ses_template(template_name):
+    """
+    Build SES Template Definition
+    
+    Converts the local email templates into an SES template with handlebars
+    placeholders, suitable for ses_client.create_template(Template=...).
+    The HTML part uses escaping {{...}} placeholders; the subject and text
+    parts use raw {{{...}}} placeholders.
+    
+    Args:
+        template_name (str): Name to register the template under
+        
+    Returns:
+        dict: SES template definition
+    """
+    
+    def placeholders(stash):
+        return {
+            'order_id': stash % 'orderId',
+            'customer_name': stash % 'customerName',
+            'customer_email': stash % 'customerEmail',
+            'product_name': stash % 'productName',
+            'quantity': stash % 'quantity',
+            'total_price': stash % 'totalPrice',
+            'order_status': stash % 'orderStatus',
+            'order_date': stash % 'orderDate'
+        }
+    
+    html_part = _HTML_TEMPLATE.format(
+        description_row=('{{#if productDescription}}'
+                         + _HTML_DESCRIPTION_ROW.format(product_description='{{productDescription}}')
+                         + '{{/if}}'),
+        unit_price_row=('{{#if unitPrice}}'
+                        + _HTML_UNIT_PRICE_ROW.format(unit_price='{{unitPrice}}')
+                        + '{{/if}}'),
+        **placeholders('{{%s}}')
+    )
+    text_part = _TEXT_TEMPLATE.format(
+        description_line=('{{#if productDescription}}'
+                          + _TEXT_DESCRIPTION_LINE.format(product_description='{{{productDescription}}}')
+                          + '{{/if}}'),
+        unit_price_line=('{{#if unitPrice}}'
+                         + _TEXT_UNIT_PRICE_LINE.format(unit_price='{{{unitPrice}}}')
+                         + '{{/if}}'),
+        **placeholders('{{{%s}}}')
+    )
+    
+    return {
+        'TemplateName': template_name,
+        'SubjectPart': _SUBJECT_FORMAT % ('{{{orderId}}}',),
+        'HtmlPart': html_part,
+        'TextPart': text_part
+    }
+
+
+# Email templates
+#
+# The templates are written as str.format() sources and split into static
+# fragments once at import time, so warm invocations only join the per-order
+# fields between them. Optional rows are rendered separately and spliced in.
+
+_SUBJECT_FORMAT: Final[str] = 'Order Confirmation - Order #%s'
+
+_EMAIL_STYLES: Final[str] = '''
+        body {
+            font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            margin: 0;
+            padding: 0;
+            background-color: #f4f4f4;
+        }
+        .container {
+            max-width: 600px;
+            margin: 20px auto;
+            background: #ffffff;
+            border-radius: 10px;
+            overflow: hidden;
+            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 30px 20px;
+            text-align: center;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 28px;
+            font-weight: 600;
+        }
+        .header p {
+            margin: 10px 0 0 0;
+            font-size: 16px;
+            opacity: 0.9;
+        }
+        .content {
+            padding: 30px 20px;
+        }
+        .greeting {
+            font-size: 18px;
+            color: #333;
+            margin-bottom: 20px;
+        }
+        .order-details {
+            background: #f8f9fa;
+            border-left: 4px solid #667eea;
+            padding: 20px;
+            margin: 20px 0;
+            border-radius: 5px;
+        }
+        .order-details h2 {
+            margin-top: 0;
+            color: #667eea;
+            font-size: 20px;
+        }
+        .detail-row {
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #e9ecef;
+        }
+        .detail-row:last-child {
+            border-bottom: none;
+        }
+        .detail-label {
+            font-weight: 600;
+            color: #495057;
+        }
+        .detail-value {
+            color: #212529;
+        }
+        .total-price {
+            font-size: 24px;
+            font-weight: bold;
+            color: #667eea;
+        }
+        .status-badge {
+            display: inline-block;
+            padding: 5px 15px;
+            border-radius: 20px;
+            font-size: 14px;
+            font-weight: 600;
+            background-color: #28a745;
+            color: white;
+        }
+        .message {
+            background: #e7f3ff;
+            border-left: 4px solid #007bff;
+            padding: 15px;
+            margin: 20px 0;
+            border-radius: 5px;
+        }
+        .footer {
+            background: #f8f9fa;
+            padding: 20px;
+            text-align: center;
+            color: #6c757d;
+            font-size: 14px;
+        }
+        .footer a {
+            color: #667eea;
+            text-decoration: none;
+        }
+        .button {
+            display: inline-block;
+            padding: 12px 30px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            text-decoration: none;
+            border-radius: 5px;
+            margin: 20px 0;
+            font-weight: 600;
+        }
+    '''
+
+_HTML_SOURCE: Final[str] = '''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -233,7 +609,7 @@ def generate_html_email(event):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Order Confirmation</title>
     <style>
-        {get_email_styles()}
+        {styles}
     </style>
 </head>
 <body>
@@ -279,18 +655,18 @@ def generate_html_email(event):
                     <span class="detail-value">{product_name}</span>
                 </div>
                 
-                {f'<div class="detail-row"><span class="detail-label">Description:</span><span class="detail-value">{product_description}</span></div>' if product_description else ''}
+                {description_row}
                 
                 <div class="detail-row">
                     <span class="detail-label">Quantity:</span>
                     <span class="detail-value">{quantity}</span>
                 </div>
                 
-                {f'<div class="detail-row"><span class="detail-label">Unit Price:</span><span class="detail-value">${format_price(unit_price)}</span></div>' if unit_price else ''}
+                {unit_price_row}
                 
                 <div class="detail-row">
                     <span class="detail-label">Total Amount:</span>
-                    <span class="total-price">${format_price(total_price)}</span>
+                    <span class="total-price">${total_price}</span>
                 </div>
             </div>
             
@@ -328,37 +704,17 @@ def generate_html_email(event):
 </body>
 </html>
 '''
-    
-    return html
 
+# Bake the stylesheet into the template once; its braces must be doubled so
+# str.format() leaves them alone.
+_HTML_TEMPLATE: Final[str] = _HTML_SOURCE.replace(
+    '{styles}', _EMAIL_STYLES.replace('{', '{{').replace('}', '}}'))
 
-def generate_text_email(event):
-    """
-    Generate Plain Text Email Template
-    
-    Creates a plain text version for non-HTML email clients.
-    
-    Args:
-        event (dict): Order email event
-        
-    Returns:
-        str: Plain text email content
-    """
-    
-    # Extract data
-    order_id = event.get('orderId', 'N/A')
-    customer_name = event.get('customerName', 'Customer')
-    customer_email = event.get('customerEmail', '')
-    product_name = event.get('productName', 'Product')
-    product_description = event.get('productDescription', '')
-    quantity = event.get('quantity', 1)
-    unit_price = event.get('unitPrice')
-    total_price = event.get('totalPrice', 0)
-    order_status = event.get('orderStatus', 'CONFIRMED')
-    order_date = format_date(event.get('orderDate'))
-    
-    # Build text
-    text = f'''
+_HTML_DESCRIPTION_ROW: Final[str] = '<div class="detail-row"><span class="detail-label">Description:</span><span class="detail-value">{product_description}</span></div>'
+
+_HTML_UNIT_PRICE_ROW: Final[str] = '<div class="detail-row"><span class="detail-label">Unit Price:</span><span class="detail-value">${unit_price}</span></div>'
+
+_TEXT_TEMPLATE: Final[str] = '''
 ORDER CONFIRMATION
 ==================
 
@@ -375,10 +731,8 @@ Status: {order_status}
 PRODUCT DETAILS:
 ----------------
 Product: {product_name}
-{f'Description: {product_description}' if product_description else ''}
-Quantity: {quantity}
-{f'Unit Price: ${format_price(unit_price)}' if unit_price else ''}
-Total Amount: ${format_price(total_price)}
+{description_line}Quantity: {quantity}
+{unit_price_line}Total Amount: ${total_price}
 
 WHAT'S NEXT?
 ------------
@@ -395,129 +749,162 @@ If you have any questions about your order, please contact our customer support
 
 This email was sent to {customer_email} because you placed an order.
 '''
+
+# Optional lines carry their own newline, so nothing is left behind when omitted
+_TEXT_DESCRIPTION_LINE: Final[str] = 'Description: {product_description}\n'
+
+_TEXT_UNIT_PRICE_LINE: Final[str] = 'Unit Price: ${unit_price}\n'
+
+
+def _compile_template(source):
+    """
+    Split a str.format() template into its static fragments
+    
+    Args:
+        source (str): Template with {field} placeholders
+        
+    Returns:
+        tuple: (literal fragments, field names); there is one more
+               fragment than there are fields
+        
+    Raises:
+        ValueError: If a field uses a conversion or format spec, which
+                    _render_template() does not apply
+    """
+    fragments = ['']
+    fields = []
+    
+    for literal, field, format_spec, conversion in string.Formatter().parse(source):
+        fragments[-1] += literal
+        if field is not None:
+            if format_spec or conversion:
+                raise ValueError(f'Template field {{{field}}} must not use a conversion or format spec')
+            fields.append(field)
+            fragments.append('')
     
-    return text
+    return tuple(fragments), tuple(fields)
 
 
-def get_email_styles():
+def _render_template(compiled, values):
     """
-    Get Email CSS Styles
+    Render a compiled template with a single str.join()
     
+    Args:
+        compiled (tuple): Result of _compile_template()
+        values (dict): Field values
+        
     Returns:
-        str: CSS styles for HTML email
+        str: Rendered template
     """
-    return '''
-        body {
-            font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            margin: 0;
-            padding: 0;
-            background-color: #f4f4f4;
-        }
-        .container {
-            max-width: 600px;
-            margin: 20px auto;
-            background: #ffffff;
-            border-radius: 10px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }
-        .header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px 20px;
-            text-align: center;
-        }
-        .header h1 {
-            margin: 0;
-            font-size: 28px;
-            font-weight: 600;
-        }
-        .header p {
-            margin: 10px 0 0 0;
-            font-size: 16px;
-            opacity: 0.9;
-        }
-        .content {
-            padding: 30px 20px;
-        }
-        .greeting {
-            font-size: 18px;
-            color: #333;
-            margin-bottom: 20px;
-        }
-        .order-details {
-            background: #f8f9fa;
-            border-left: 4px solid #667eea;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 5px;
-        }
-        .order-details h2 {
-            margin-top: 0;
-            color: #667eea;
-            font-size: 20px;
-        }
-        .detail-row {
-            display: flex;
-            justify-content: space-between;
-            padding: 10px 0;
-            border-bottom: 1px solid #e9ecef;
-        }
-        .detail-row:last-child {
-            border-bottom: none;
-        }
-        .detail-label {
-            font-weight: 600;
-            color: #495057;
-        }
-        .detail-value {
-            color: #212529;
-        }
-        .total-price {
-            font-size: 24px;
-            font-weight: bold;
-            color: #667eea;
-        }
-        .status-badge {
-            display: inline-block;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-size: 14px;
-            font-weight: 600;
-            background-color: #28a745;
-            color: white;
-        }
-        .message {
-            background: #e7f3ff;
-            border-left: 4px solid #007bff;
-            padding: 15px;
-            margin: 20px 0;
-            border-radius: 5px;
-        }
-        .footer {
-            background: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            color: #6c757d;
-            font-size: 14px;
-        }
-        .footer a {
-            color: #667eea;
-            text-decoration: none;
-        }
-        .button {
-            display: inline-block;
-            padding: 12px 30px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            text-decoration: none;
-            border-radius: 5px;
-            margin: 20px 0;
-            font-weight: 600;
-        }
-    '''
+    fragments, fields = compiled
+    parts = [fragments[0]]
+    
+    for field, fragment in zip(fields, fragments[1:]):
+        parts.append(str(values[field]))
+        parts.append(fragment)
+    
+    return ''.join(parts)
+
+
+# Pre-split templates, so rendering only interleaves the dynamic fields
+_HTML_PARTS: Final = _compile_template(_HTML_TEMPLATE)
+_HTML_DESCRIPTION_ROW_PARTS: Final = _compile_template(_HTML_DESCRIPTION_ROW)
+_HTML_UNIT_PRICE_ROW_PARTS: Final = _compile_template(_HTML_UNIT_PRICE_ROW)
+_TEXT_PARTS: Final = _compile_template(_TEXT_TEMPLATE)
+_TEXT_DESCRIPTION_LINE_PARTS: Final = _compile_template(_TEXT_DESCRIPTION_LINE)
+_TEXT_UNIT_PRICE_LINE_PARTS: Final = _compile_template(_TEXT_UNIT_PRICE_LINE)
+
+
+def generate_html_email(order_id, customer_name, customer_email, product_name,
+                        product_description, quantity, unit_price, total_price,
+                        order_status, order_date):
+    """
+    Generate HTML Email Template
+    
+    Creates a beautiful HTML email with order details.
+    
+    Args:
+        order_id: Order ID
+        customer_name (str): Customer name
+        customer_email (str): Customer email address
+        product_name (str): Product name
+        product_description (str): Product description, may be empty
+        quantity (int): Quantity ordered
+        unit_price (str): Formatted unit price, or empty if unknown
+        total_price (str): Formatted total price
+        order_status (str): Order status
+        order_date (str): Formatted order date
+        
+    Returns:
+        str: HTML email content
+    """
+    
+    product_description = escape_html(product_description)
+    
+    # Render optional rows
+    description_row = (_render_template(_HTML_DESCRIPTION_ROW_PARTS,
+                                        {'product_description': product_description})
+                       if product_description else '')
+    unit_price_row = (_render_template(_HTML_UNIT_PRICE_ROW_PARTS, {'unit_price': unit_price})
+                      if unit_price else '')
+    
+    return _render_template(_HTML_PARTS, {
+        'order_id': order_id,
+        'customer_name': escape_html(customer_name),
+        'customer_email': escape_html(customer_email),
+        'product_name': escape_html(product_name),
+        'description_row': description_row,
+        'quantity': quantity,
+        'unit_price_row': unit_price_row,
+        'total_price': total_price,
+        'order_status': order_status,
+        'order_date': order_date
+    })
+
+
+def generate_text_email(order_id, customer_name, customer_email, product_name,
+                        product_description, quantity, unit_price, total_price,
+                        order_status, order_date):
+    """
+    Generate Plain Text Email Template
+    
+    Creates a plain text version for non-HTML email clients.
+    
+    Args:
+        order_id: Order ID
+        customer_name (str): Customer name
+        customer_email (str): Customer email address
+        product_name (str): Product name
+        product_description (str): Product description, may be empty
+        quantity (int): Quantity ordered
+        unit_price (str): Formatted unit price, or empty if unknown
+        total_price (str): Formatted total price
+        order_status (str): Order status
+        order_date (str): Formatted order date
+        
+    Returns:
+        str: Plain text email content
+    """
+    
+    # Render optional lines
+    description_line = (_render_template(_TEXT_DESCRIPTION_LINE_PARTS,
+                                         {'product_description': product_description})
+                        if product_description else '')
+    unit_price_line = (_render_template(_TEXT_UNIT_PRICE_LINE_PARTS, {'unit_price': unit_price})
+                       if unit_price else '')
+    
+    return _render_template(_TEXT_PARTS, {
+        'order_id': order_id,
+        'customer_name': customer_name,
+        'customer_email': customer_email,
+        'product_name': product_name,
+        'description_line': description_line,
+        'quantity': quantity,
+        'unit_price_line': unit_price_line,
+        'total_price': total_price,
+        'order_status': order_status,
+        'order_date': order_date
+    })
 
 
 def format_date(date_string):
@@ -534,24 +921,39 @@ def format_date(date_string):
         return 'N/A'
     
     try:
-        # Parse ISO format (e.g., "2024-01-31T10:30:00")
-        dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-        return dt.strftime('%B %d, %Y at %I:%M %p')
-    except Exception as e:
-        logger.warning(f'Failed to parse date: {date_string}, error: {e}')
-        return str(date_string)
+        # Parse ISO format (e.g., "2024-01-31T10:30:00"); Python 3.11+ accepts a "Z" suffix
+        dt = datetime.fromisoformat(date_string)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        except Exception as e:
+            logger.warning(f'Failed to parse date: {date_string}, error: {e}')
+            return str(date_string)
+    
+    return dt.strftime(_DATE_FORMAT)
 
 
 def format_price(price):
     """
     Format price with 2 decimal places
     
+    Results are cached, since the same prices recur across orders.
+    
     Args:
         price (float/Decimal/str): Price value
         
     Returns:
         str: Formatted price (e.g., "99.99")
     """
+    try:
+        return _format_price_cached(price)
+    except TypeError:
+        # Unhashable values (e.g. lists) cannot be cached or formatted
+        return '0.00'
+
+
+@functools.lru_cache(maxsize=512)
+def _format_price_cached(price):
     if price is None:
         return '0.00'
     
@@ -563,6 +965,30 @@ def format_price(price):
         return '0.00'
 
 
+def to_json(obj, default=None):
+    """
+    Serialize to a JSON string
+    
+    Uses orjson when it is installed, otherwise the standard json module.
+    orjson rejects some values json accepts (integers wider than 64 bits,
+    non-str keys), so those fall back to json as well.
+    
+    Args:
+        obj: Value to serialize
+        default (callable): Fallback for values that are not JSON serializable
+        
+    Returns:
+        str: JSON text
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default).decode()
+        except orjson.JSONEncodeError:
+            pass
+    
+    return json.dumps(obj, default=default)
+
+
 def escape_html(text):
     """
     Escape HTML special characters
@@ -576,19 +1002,16 @@ def escape_html(text):
     if not text:
         return ''
     
-    return (str(text)
-            .replace('&', '&amp;')
-            .replace('<', '&lt;')
-            .replace('>', '&gt;')
-            .replace('"', '&quot;')
-            .replace("'", '&#39;'))
+    # Event fields parsed from JSON are usually str already
+    if not isinstance(text, str):
+        text = str(text)
+    
+    return html.escape(text, quote=True)
 
 
-# For local testing
+# For local testing (SENDER_EMAIL is read at import time, so set it in the shell):
+#   SENDER_EMAIL=test@example.com python lambda_function.py
 if __name__ == '__main__':
-    # Set environment variable
-    os.environ['SENDER_EMAIL'] = 'test@example.com'
-    
     # Create test event
     test_event = {
         'orderId': 'test-123',
@@ -605,8 +1028,11 @@ if __name__ == '__main__':
     
     # Create mock context
     class MockContext:
-        request_id = 'test-request-id'
-        function_name = 'send-order-email'
+        __slots__ = ('request_id', 'function_name')
+        
+        def __init__(self):
+            self.request_id = 'test-request-id'
+            self.function_name = 'send-order-email'
     
     # Test handler
     result = lambda_handler(test_event, MockContext())